@@ -0,0 +1,420 @@
+import os
+import time
+import board
+import digitalio
+import supervisor
+import storage
+from adafruit_hid.mouse import Mouse
+from digitalio import DigitalInOut, Direction, Pull
+from seeed_xiao_nrf52840 import Battery
+from adafruit_ble.services.standard import BatteryService
+
+# imports needed for bluetooth
+import _bleio
+import adafruit_ble
+from adafruit_ble.advertising import Advertisement
+from adafruit_ble.advertising.standard import ProvideServicesAdvertisement
+from adafruit_ble.services.standard.hid import HIDService
+from adafruit_ble.services.standard.device_info import DeviceInfoService
+
+
+# config defaults - we load hand specific configs from the config.py
+# file. Any customizations can be made in config.py so that no
+# edits are required to this file when the code is updated.
+from config import config as hand_config
+config = {
+    'charge_current': Battery.CHARGE_50MA,
+    'log_level': 'info',
+    'log_to_disk': True,
+    'blink_interval_s': 10, # lower to blink status more frequently
+    'battery_interval_s': 30, # between battery level checks
+    # for button debounce - seconds a button has to read steady
+    # before a press or release is reported
+    'debounce_sleep': 0.01,
+    # Scroll settings
+    'sp_initial': 0.2,
+    'sp_accel': 0.015,
+    'sp_max': 0.01,
+    # BLE connection interval in ms to request from the host once
+    # connected (multiple of 1.25, 7.5 minimum). None keeps the host's
+    # choice.
+    'connection_interval': 11.25,
+}
+config.update(hand_config)
+
+# Freeze the merged config into plain constants, so nothing after this
+# point (in particular the main loop) has to look keys up in the dict.
+CHARGE_CURRENT = config['charge_current']
+LOG_LEVEL = config['log_level']
+LOG_TO_DISK = config['log_to_disk']
+BLINK_PERIOD_NS = int(config['blink_interval_s'] * 1_000_000_000)
+BATTERY_PERIOD_NS = int(config['battery_interval_s'] * 1_000_000_000)
+DEBOUNCE_NS = int(config['debounce_sleep'] * 1_000_000_000)
+SP_INITIAL_NS = int(config['sp_initial'] * 1_000_000_000)
+SP_ACCEL_NS = int(config['sp_accel'] * 1_000_000_000)
+SP_MAX_NS = int(config['sp_max'] * 1_000_000_000)
+CONNECTION_INTERVAL = config['connection_interval']
+COMPLETE_NAME = config['complete_name']
+LEFT_BTN_PIN = config['left_btn']
+RIGHT_BTN_PIN = config['right_btn']
+SCROLLUP_BTN_PIN = config['scrollup_btn']
+SCROLLDOWN_BTN_PIN = config['scrolldown_btn']
+
+
+# Instead of sleeps, which block any other operations,  we get the
+# timestamp for some time in the future, and do checks for passing that
+# time to take the required follow-on actions - ex turning off LEDs
+# after turning them on, scrollwheel acceleration. All delays are kept
+# as integer nanoseconds so they can be added straight onto
+# time.monotonic_ns().
+LED_FLASH_NS = 100_000_000
+CONNECT_BLINK_NS = 500_000_000
+CONNECT_POLL_S = 0.01
+
+
+###########################
+# Code for logging messages 
+###########################
+# Logging Levels
+LLVL={'debug': 0, 'info': 1, 'warn': 2, 'error':3}
+# Set up logfile - rotate old ones.
+logfile_handle = None
+if LOG_TO_DISK:
+    try:
+        storage.remount("/",readonly=False)
+        # try each rename and skip the missing files, rather than
+        # listing the directory to check for them first. The oldest
+        # log is removed so the renames don't collide with it.
+        try:
+            os.remove("logfile.log.3")
+        except OSError:
+            pass
+        for i in reversed(range(3)):
+            try:
+                os.rename(f"logfile.log.{i}",f"logfile.log.{i+1}")
+            except OSError:
+                pass
+        try:
+            os.rename("logfile.log","logfile.log.0")
+        except OSError:
+            pass
+        logfile_handle = open("logfile.log","w")
+    except (OSError, RuntimeError):
+        pass
+
+def logtime():
+    cur_time = time.localtime()
+    return f"{cur_time.tm_hour:02d}:{cur_time.tm_min:02d}:{cur_time.tm_sec:02d}"
+
+# Lines for the logfile are buffered, and the main loop writes them out
+# at most once per LOG_FLUSH_NS while no button is held, so that log
+# calls from the button handlers never hit the filesystem themselves.
+# Errors, and a buffer of LOG_BUF_LINES, are written immediately.
+LOG_FLUSH_NS = 1_000_000_000
+LOG_BUF_LINES = 32
+_MIN_LVL = LLVL[LOG_LEVEL]
+# lets hot-path debug traces skip building their message entirely
+LOG_DEBUG = _MIN_LVL <= LLVL['debug']
+_logbuf = []
+_logbuf_deadline = 0
+
+def flush_log(now):
+    global _logbuf_deadline
+    _logbuf_deadline = now + LOG_FLUSH_NS
+    if logfile_handle is not None and _logbuf:
+        logfile_handle.write("".join(_logbuf))
+        logfile_handle.flush()
+        _logbuf.clear()
+
+# function to log a message to console, and if possible
+# to a file on disk
+def log(level,message):
+    if LLVL[level] < _MIN_LVL:
+        return
+    log_line = logtime()+" "+message
+    print(log_line)
+    if logfile_handle is not None:
+        _logbuf.append(log_line+"\n")
+        if len(_logbuf) >= LOG_BUF_LINES or level == 'error':
+            flush_log(time.monotonic_ns())
+
+# try to capture failures. - if the program crashes the backtrace
+# will be logged when the program restarts.
+supervisor.set_next_code_file(filename='code.py', reload_on_error=True)
+backtrace = supervisor.get_previous_traceback()
+if backtrace is not None:
+    log('error',"Previous run crashed.. backtrace follows...")
+    log('error',backtrace)
+
+# 'blink_interval' used to count main loop iterations, and is no longer
+# read - point anyone still setting it at the seconds based key.
+if 'blink_interval' in hand_config:
+    log('warn',"config 'blink_interval' (loop iterations) is ignored, "
+               "set 'blink_interval_s' (seconds) instead")
+
+
+######################
+# Set up initial state
+######################
+
+# set LEDs
+blue_led = DigitalInOut(board.LED_BLUE)
+blue_led.direction = Direction.OUTPUT
+green_led = DigitalInOut(board.LED_GREEN)
+green_led.direction = Direction.OUTPUT
+red_led = DigitalInOut(board.LED_RED)
+red_led.direction = Direction.OUTPUT
+blue_led.value = True  # turn off LED
+green_led.value = True  # turn off LED
+red_led.value = True  # turn off LED
+
+# Battery set
+battery = Battery()
+log('info',f"Charge status (True-full charged, False-otherwise): {battery.charge_status}")
+log('info',f"Voltage: {battery.voltage}V")
+battery.charge_current = CHARGE_CURRENT  # Setting charge current to high
+log('info',f"Charge current (0-50mA, 1-100mA): {battery.charge_current}")
+battery_service = BatteryService()
+
+# setup bluetooth
+hid = HIDService()
+device_info = DeviceInfoService(software_revision=adafruit_ble.__version__)
+advertisement = ProvideServicesAdvertisement(hid)
+advertisement.appearance = 961
+scan_response = Advertisement()
+scan_response.complete_name = COMPLETE_NAME
+ble = adafruit_ble.BLERadio()
+ble.name = COMPLETE_NAME # set name after connection
+
+# set buttons
+left_BTN = digitalio.DigitalInOut(LEFT_BTN_PIN)
+left_BTN.direction = Direction.INPUT
+left_BTN.pull = Pull.UP
+right_BTN = digitalio.DigitalInOut(RIGHT_BTN_PIN)
+right_BTN.direction = Direction.INPUT
+right_BTN.pull = Pull.UP
+scrollup_BTN = digitalio.DigitalInOut(SCROLLUP_BTN_PIN)
+scrollup_BTN.direction = Direction.INPUT
+scrollup_BTN.pull = Pull.UP
+scrolldown_BTN = digitalio.DigitalInOut(SCROLLDOWN_BTN_PIN)
+scrolldown_BTN.direction = Direction.INPUT
+scrolldown_BTN.pull = Pull.UP
+
+# set mouse
+mouse = Mouse(hid.devices)
+
+# The four buttons are read into one bitmask per pass. The pins are
+# pulled up, so a set bit means the button is released.
+BTN_LEFT = 0b0001
+BTN_RIGHT = 0b0010
+BTN_UP = 0b0100
+BTN_DOWN = 0b1000
+BTN_CLICKS = BTN_LEFT | BTN_RIGHT
+BTN_NONE = BTN_LEFT | BTN_RIGHT | BTN_UP | BTN_DOWN  # all released
+
+
+##########################
+# Battery related routines
+##########################
+BATT_EMPTY_V = 3.5
+BATT_FULL_V = 4.2
+_BATT_PCT_PER_V = 100 / (BATT_FULL_V - BATT_EMPTY_V)
+
+def get_batt_percent(volts):
+    # Returns battery capacity percent as an integer
+    # from 0 to 100, linear between BATT_EMPTY_V and BATT_FULL_V.
+    if volts >= BATT_FULL_V:
+        return 100
+    if volts <= BATT_EMPTY_V:
+        return 0
+    return round((volts - BATT_EMPTY_V) * _BATT_PCT_PER_V)
+
+def battery_leds():
+    # set green/orange/red LED based on battery state/level, and
+    # return the battery percent.
+    # 3.7V lithium ion battery can be considered dead (completely discharged) at a voltage of 3.4V
+    volts = battery.voltage
+    percent = get_batt_percent(volts)
+
+    charge_status = battery.charge_status
+    log('info',f"Voltage: {volts}V Pct: {percent}% Charged: {charge_status}")
+    #if volts > 3.7:
+    if charge_status:
+        green_led.value = False  # turn on LED
+    elif percent > 79:
+        green_led.value = False
+    elif percent > 29:
+        green_led.value = False
+        red_led.value = False
+    else:
+        # below 3.5 / 30%
+        red_led.value = False
+    return percent
+
+
+############################
+# Bluetooth related routines
+############################
+def request_connection_interval():
+    # Ask the host for a short connection interval, so HID reports are
+    # sent without waiting out a long default interval. The host has the
+    # final say and the update is negotiated in the background, so the
+    # current value is logged alongside the request.
+    if CONNECTION_INTERVAL is None:
+        return
+    for connection in ble.connections:
+        try:
+            connection.connection_interval = CONNECTION_INTERVAL
+            log('info',f"Requested connection interval {CONNECTION_INTERVAL}ms, "
+                       f"current {connection.connection_interval}ms")
+        except (_bleio.BluetoothError, OSError) as err:
+            log('warn',f"Could not set connection interval: {err}")
+
+
+# Turns off all LED's
+def leds_off():
+    blue_led.value = True  # reset LED status
+    green_led.value = True  # reset LED status
+    red_led.value = True  # reset LED status
+
+
+# The click and scroll buttons share one code path each, driven by
+# these tables: (mask bit, mouse button, pressed/released log messages)
+# and (mask bit, wheel step, pressed log message).
+CLICK_BUTTONS = (
+    (BTN_LEFT, Mouse.LEFT_BUTTON, "Left Button is pressed", "Left Button is released"),
+    (BTN_RIGHT, Mouse.RIGHT_BUTTON, "Right Button is pressed", "Right Button is released"),
+)
+SCROLL_BUTTONS = (
+    (BTN_UP, 1, "Up Button is pressed"),
+    (BTN_DOWN, -1, "Down Button is pressed"),
+)
+
+
+###########
+# MAIN LOOP
+###########
+def run():
+    # Bind the attributes used on every pass to locals, so the loop does
+    # not repeat the global/attribute lookups.
+    _mono = time.monotonic_ns
+    _press = mouse.press
+    _release = mouse.release
+    _move = mouse.move
+
+    ledoff_time = None
+    scroll_sleep_ns = SP_INITIAL_NS
+    next_scroll_ns = 0
+    # Buttons are debounced by deferring changes: btn_state is the last
+    # debounced button mask, raw_state the last mask read from the pins
+    # and raw_change_ns when it last changed. A change in raw_state only
+    # makes it into btn_state once the pins have read steady for
+    # DEBOUNCE_NS, and any bounce in between restarts that wait.
+    btn_state = raw_state = BTN_NONE
+    raw_change_ns = 0
+
+    # Status blinks and battery checks run on their own deadlines; the
+    # battery check starts half a period in so the two do not coincide.
+    now = _mono()
+    next_blink_ns = now + BLINK_PERIOD_NS
+    next_battery_ns = now + BATTERY_PERIOD_NS // 2
+
+    while True:
+        if not ble.connected:
+            ble.start_advertising(advertisement, scan_response)
+            log('info',"Advertising...")
+            # blink the blue LED on a deadline while waiting, checking
+            # for the connection every CONNECT_POLL_S so it is picked up
+            # quickly while still letting the MCU idle between checks
+            next_toggle = _mono()
+            led_on = False
+            while not ble.connected:
+                now = _mono()
+                if now >= next_toggle:
+                    led_on = not led_on
+                    blue_led.value = not led_on
+                    next_toggle = now + CONNECT_BLINK_NS
+                    if led_on:
+                        log('info',"Connecting...")
+                    if now >= _logbuf_deadline:
+                        flush_log(now)
+                time.sleep(CONNECT_POLL_S)
+            blue_led.value = True  # turn off LED
+            # Now we're connected
+            ble.stop_advertising()
+            log('info',f"Connected {ble.connections}")
+            request_connection_interval()
+            # a click held when the link dropped is still set in the
+            # mouse report, so clear it before starting from a clean
+            # button state
+            mouse.release_all()
+            btn_state = raw_state = BTN_NONE
+            scroll_sleep_ns = SP_INITIAL_NS
+            next_scroll_ns = 0
+
+        while ble.connected:
+            # one timestamp per loop pass, shared by all the checks below
+            now = _mono()
+            buttons = (left_BTN.value | right_BTN.value << 1
+                       | scrollup_BTN.value << 2 | scrolldown_BTN.value << 3)
+
+            # Perform status LED blinks for bluetooth/voltage
+            if now >= next_blink_ns:
+                blue_led.value = False
+                ledoff_time = now + LED_FLASH_NS
+                next_blink_ns = now + BLINK_PERIOD_NS
+            elif (now >= next_battery_ns and buttons == BTN_NONE
+                  and btn_state == BTN_NONE):
+                # reading the battery stalls the loop for a few ms, so it
+                # waits until no button is held - neither debounced nor
+                # still settling after a fresh press. The BatteryService
+                # level shows the battery icon with percentage in Windows.
+                battery_service.level = battery_leds()
+                ledoff_time = now + LED_FLASH_NS
+                next_battery_ns = now + BATTERY_PERIOD_NS
+                flush_log(now)
+            elif ledoff_time is not None and ledoff_time < now:
+                if LOG_DEBUG:
+                    log('debug',f"LightsOut {ledoff_time} MONO {now}")
+                ledoff_time = None
+                leds_off()
+            elif (_logbuf and now >= _logbuf_deadline and buttons == BTN_NONE
+                  and btn_state == BTN_NONE):
+                flush_log(now)
+
+            # Debounce, then handle button clicks. Clicks follow the
+            # debounced edges - press when the button goes down, release
+            # when it comes back up - so the loop (and BLE) keeps running
+            # while a button is held.
+            if buttons != raw_state:
+                raw_state = buttons
+                raw_change_ns = now
+            elif buttons != btn_state and now - raw_change_ns >= DEBOUNCE_NS:
+                clicks = (buttons ^ btn_state) & BTN_CLICKS
+                btn_state = buttons
+                for bit, button, pressed_msg, released_msg in CLICK_BUTTONS:
+                    if clicks & bit:
+                        if buttons & bit:
+                            _release(button)
+                            log('info',released_msg)
+                        else:
+                            _press(button)
+                            log('info',pressed_msg)
+
+            # Scroll buttons repeat while held, speeding up each step
+            for bit, wheel, pressed_msg in SCROLL_BUTTONS:
+                if not btn_state & bit:
+                    if now >= next_scroll_ns:
+                        scroll_sleep_ns = max(SP_MAX_NS, scroll_sleep_ns - SP_ACCEL_NS)
+                        next_scroll_ns = now + scroll_sleep_ns
+                        _move(wheel=wheel)
+                        log('info',pressed_msg)
+                    break
+            else:
+                if scroll_sleep_ns != SP_INITIAL_NS:
+                    log('info',"scroll_sleep reset")
+                    scroll_sleep_ns = SP_INITIAL_NS
+                    next_scroll_ns = 0
+
+        log('info','Not Connected (lost connection)')
+        flush_log(_mono())
@@ -1,5 +1,5 @@
 # config.py
-# Settings here will override any defaults in code.py
+# Settings here will override any defaults in mouse_ring_main.py
 import board
 config = {
     'complete_name': 'Right Mouse Ring',
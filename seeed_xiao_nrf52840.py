@@ -12,6 +12,10 @@ the Sense model)
 
 * Author(s): Phil Underwood
 
+Locally modified for Mouse-buttons-and-wheel (based on upstream v1.0.1):
+``Battery.voltage`` precomputes its scale factor and averages the settled
+10th to 15th ADC readings.
+
 Implementation Notes
 --------------------
 
@@ -177,6 +181,8 @@ class Battery:
         self._read_batt_enable.direction = digitalio.Direction.INPUT
 
         self._vbat = analogio.AnalogIn(board.VBATT)
+        # volts per ADC count, including the x3.1 divider on VBATT
+        self._vbat_scale = self._vbat.reference_voltage * 3.1 / 65535.0
 
     @property
     def charge_status(self) -> bool:
@@ -198,10 +204,15 @@ class Battery:
         # we need to take 10 readings in quick succession. The nrf port
         # selects a very short acquisition time, which is not enough with
         # a really high impedance input like we are using, so if we take several
-        # readings, the later ones will be more accurate
+        # readings, the later ones will be more accurate. The settled 10th
+        # to 15th readings are averaged to reduce ADC noise.
+        vbat = self._vbat
         for _i in range(9):
-            _ = self._vbat.value
-        value = (self._vbat.value / 65535.0) * self._vbat.reference_voltage * 3.1
+            _ = vbat.value
+        total = 0
+        for _i in range(6):
+            total += vbat.value
+        value = total / 6 * self._vbat_scale
         self._read_batt_enable.direction = digitalio.Direction.INPUT
         return value
 
@@ -240,5 +251,5 @@ class Battery:
         self.deinit()
 
 
-__version__ = "v1.0.1"
+__version__ = "v1.0.1+mousering"
 __repo__ = "https://github.com/furbrain/CircuitPython_seeed_xiao_nRF52840.git"